@@ -3,19 +3,27 @@
 Supports:
   * creds file authentication (preferred)
   * raw JWT + NKey seed authentication
-  * plain core NATS subscriptions OR JetStream durable pull consumers
+  * JetStream ephemeral pull consumers with batched fetches (default)
+  * JetStream ephemeral push consumers, or plain core NATS subscriptions
 
 Run `python main.py --help` for CLI usage.
 """
 
 from __future__ import annotations
 
+import argparse
 import asyncio
+import functools
 import signal
 import os
-from typing import Callable, Awaitable, Tuple
+import platform
+import re
+import sys
+from typing import Callable, Awaitable, Optional, Sequence, Tuple
 
 import nats
+from nats.aio.msg import Msg
+from nats.js.api import AckPolicy, ConsumerConfig
 from nats.errors import ConnectionClosedError, TimeoutError, NoServersError
 from dotenv import load_dotenv
 
@@ -28,10 +36,64 @@ except ImportError:  # pragma: no cover
 
 load_dotenv()  # read .env if present
 
-DEFAULT_SERVER = os.getenv("NATS_SERVER", "nats://127.0.0.1:4223")
+DEFAULT_SERVER = "nats://127.0.0.1:4223"
 
 # Subject wildcard to subscribe to (JetStream stream must export it)
-DEFAULT_SUBJECT = os.getenv("NATS_SUBJECT", "basic.>")
+DEFAULT_SUBJECT = "basic.>"
+
+MODES = ("core", "pull", "push")
+
+# Received messages are appended here as ready-to-write lines and flushed to
+# stdout in batches, instead of one print()/write per message.
+_OUT_BUF: list[bytes] = []
+OUT_FLUSH_INTERVAL = 0.005  # seconds between periodic flushes
+OUT_FLUSH_LINES = 1024  # flush early once this many lines are buffered
+_out_error: Optional[OSError] = None  # set once stdout can no longer be written
+
+
+def _flush_out() -> None:
+    """Write every buffered line to stdout with a single write call.
+
+    A write error (e.g. BrokenPipeError under `main.py | head`) is recorded in
+    `_out_error` and stdout is pointed at /dev/null, so later output and the
+    interpreter's exit-time flush do not raise again.
+    """
+    global _out_error
+    if not _OUT_BUF:
+        return
+    try:
+        if _out_error is None:
+            sys.stdout.flush()  # keep ordering with status lines written via print()
+            sys.stdout.buffer.write(b"".join(_OUT_BUF))
+            sys.stdout.buffer.flush()
+    except OSError as e:
+        _out_error = e
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        os.close(devnull)
+    finally:
+        _OUT_BUF.clear()
+
+
+async def _flusher() -> None:
+    """Periodically flush the stdout buffer so quiet streams still show output.
+
+    Returns once stdout fails, which `run()` treats as a request to stop.
+    """
+    while _out_error is None:
+        await asyncio.sleep(OUT_FLUSH_INTERVAL)
+        _flush_out()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_kp(nkey_path: str, mtime_ns: int):
+    """Derive the NKey pair for a seed file, cached per path and modification time.
+
+    Only the most recent key pair is kept, so a superseded key is released as
+    soon as the seed file changes.
+    """
+    with open(nkey_path, "rb") as f:
+        return nkeys.from_seed(f.read().strip())
 
 
 def build_jwt_auth(jwt_path: str, nkey_path: str) -> Tuple[Callable[[], Awaitable[str]], Callable[[bytes], Awaitable[bytes]]]:
@@ -39,37 +101,239 @@ def build_jwt_auth(jwt_path: str, nkey_path: str) -> Tuple[Callable[[], Awaitabl
     if nkeys is None:
         raise RuntimeError("Package 'nkeys' required for JWT/NKey auth.\n\n  pip install nkeys")
 
+    # Read the JWT and derive the key pair once; the callbacks run on every
+    # (re)connect and should not touch the filesystem or redo the key setup.
+    # The key pair is also shared by every connection built from the same,
+    # unchanged seed file.
+    with open(jwt_path, "r", encoding="utf8") as f:
+        user_jwt = f.read().strip()
+    kp = _load_kp(nkey_path, os.stat(nkey_path).st_mtime_ns)
+
     async def jwt_cb() -> str:  # noqa: D401
         "Return the user JWT as string."  # noqa: D401
-        with open(jwt_path, "r", encoding="utf8") as f:
-            return f.read().strip()
+        return user_jwt
 
     async def sig_cb(nonce: bytes) -> bytes:  # noqa: D401
         "Sign the server nonce using the NKey seed."  # noqa: D401
-        with open(nkey_path, "rb") as f:
-            seed = f.read().strip()
-        kp = nkeys.from_seed(seed)
         return kp.sign(nonce)
 
     return jwt_cb, sig_cb
 
 
-async def run():
-    """Main async entrypoint using env vars for configuration."""
-
-    # 1. Gather config from env / .env
-    server_url = os.getenv("NATS_SERVER", DEFAULT_SERVER)
-    creds_path = os.getenv("NATS_CREDS")
-    jwt_path = os.getenv("NATS_JWT")
-    nkey_path = os.getenv("NATS_NKEY")
-    subject = os.getenv("NATS_SUBJECT", DEFAULT_SUBJECT)
+def parse_args() -> argparse.Namespace:
+    """Parse CLI flags; every flag defaults to its env var so none are required."""
+    env = os.environ.get  # .env was loaded into os.environ at import time
+    p = argparse.ArgumentParser(description="Pumpfun/Pumpswap NATS consumer")
+    p.add_argument(
+        "--mode",
+        choices=MODES,
+        default=env("NATS_MODE", "pull"),
+        help="core NATS subscription, JetStream pull consumer, or JetStream push consumer (default: pull)",
+    )
+    p.add_argument("--server", default=env("NATS_SERVER", DEFAULT_SERVER), help="NATS server URL")
+    p.add_argument("--creds", default=env("NATS_CREDS"), help="Path to creds file")
+    p.add_argument("--jwt", default=env("NATS_JWT"), help="Path to user JWT (with --nkey)")
+    p.add_argument("--nkey", default=env("NATS_NKEY"), help="Path to NKey seed (with --jwt)")
+    p.add_argument("--subject", default=env("NATS_SUBJECT", DEFAULT_SUBJECT), help="Subject or wildcard to stream")
+    p.add_argument(
+        "--batch",
+        type=int,
+        default=env("NATS_BATCH", "256"),
+        help="Max messages requested per JetStream pull (default: 256)",
+    )
+    p.add_argument(
+        "--prefetch-depth",
+        type=int,
+        default=env("NATS_PREFETCH_DEPTH", "3"),
+        help="Fetched batches buffered ahead of processing (default: 3)",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=env("NATS_WORKERS", "1"),
+        help="Parallel subscriptions (pull: sharing one consumer, core: one queue group) (default: 1)",
+    )
+    p.add_argument("--queue", default=env("NATS_QUEUE"), help="Queue group for core mode subscriptions")
+    p.add_argument(
+        "--ack-each",
+        action="store_true",
+        default=env("NATS_ACK_EACH", "") == "1",
+        help="Ack every message instead of only the last of each batch",
+    )
+    p.add_argument(
+        "--io-uring",
+        action="store_true",
+        default=env("NATS_IO_URING", "") == "1",
+        help="Use the io_uring event loop from 'uringcore' (Linux 5.11+)",
+    )
+    p.add_argument(
+        "--text-stdout",
+        action="store_true",
+        default=env("NATS_TEXT_STDOUT", "") == "1",
+        help="Replace invalid UTF-8 in payloads instead of writing raw bytes",
+    )
+    p.add_argument(
+        "--log-headers",
+        action="store_true",
+        default=env("NATS_LOG_HEADERS", "") == "1",
+        help="Include message headers in the printed output",
+    )
+    p.add_argument(
+        "--filter",
+        dest="filters",
+        action="append",
+        default=None,
+        help="Only print messages whose subject matches this pattern (repeatable, wildcards allowed)",
+    )
+    args = p.parse_args()
+    if args.mode not in MODES:  # choices= is not applied to the NATS_MODE default
+        p.error(f"invalid NATS_MODE {args.mode!r} (choose from {', '.join(MODES)})")
+    if args.filters is None:
+        args.filters = [f.strip() for f in env("NATS_FILTERS", "").split(",") if f.strip()]
+    if args.batch < 1:
+        p.error("--batch must be at least 1")
+    if args.prefetch_depth < 1:
+        p.error("--prefetch-depth must be at least 1")
+    if args.workers < 1:
+        p.error("--workers must be at least 1")
+    if args.workers > 1 and args.mode == "push":
+        p.error("--workers is not supported with --mode push")
+    return args
+
+
+def compile_subject_filter(patterns: Sequence[str]) -> Callable[[str], Optional[re.Match]]:
+    """Compile NATS subject patterns (`*` and `>` wildcards) into one matcher.
+
+    All patterns become alternatives of a single regex, so each subject is
+    scanned once regardless of how many patterns were given.
+    """
+    alternatives = []
+    for pattern in patterns:
+        tokens = pattern.split(".")
+        parts = []
+        for i, tok in enumerate(tokens):
+            if tok == "*":
+                parts.append(r"[^.]+")
+            elif tok == ">" and i == len(tokens) - 1:
+                parts.append(r".+")
+            else:
+                parts.append(re.escape(tok))
+        alternatives.append(r"\.".join(parts))
+    return re.compile("|".join(f"(?:{alt})" for alt in alternatives)).fullmatch
+
+
+def make_handler(
+    text: bool = False,
+    log_headers: bool = False,
+    subject_filter: Optional[Callable[[str], Optional[re.Match]]] = None,
+) -> Callable[[Msg], None]:
+    """Return a callback that queues `[subject] payload` lines for batched output.
+
+    With *text* set, invalid UTF-8 in payloads is replaced instead of being
+    written raw; with *log_headers* set, message headers are included as
+    `{k=v,...}` before the payload. Messages whose subject does not match
+    *subject_filter* are skipped.
+    """
+
+    def _handle(msg: Msg) -> None:
+        if subject_filter is not None and subject_filter(msg.subject) is None:
+            return
+        data = msg.data
+        if text:
+            data = data.decode(errors="replace").encode()
+        if log_headers and msg.headers:
+            hdrs = ",".join(f"{k}={v}" for k, v in msg.headers.items())
+            _OUT_BUF.append(b"[%b] {%b} %b\n" % (msg.subject.encode(), hdrs.encode(), data))
+        else:
+            _OUT_BUF.append(b"[%b] %b\n" % (msg.subject.encode(), data))
+        if len(_OUT_BUF) >= OUT_FLUSH_LINES:
+            _flush_out()
+
+    return _handle
+
+
+async def _nak(msgs: Sequence[Msg]) -> None:
+    """Nak unprocessed messages so they get redelivered."""
+    await asyncio.gather(*(m.nak() for m in msgs), return_exceptions=True)
+
+
+async def _nak_pending(batches: asyncio.Queue) -> None:
+    """Nak prefetched messages that were never processed."""
+    pending = []
+    while not batches.empty():
+        pending.extend(batches.get_nowait())
+    await _nak(pending)
+
+
+async def _start_pull(js, args: argparse.Namespace, handle: Callable[[Msg], None]):
+    """Start fetch/ack tasks for a JetStream pull consumer.
+
+    Returns the worker tasks and their prefetch queues, which must be nak'd
+    once the workers are cancelled.
+    """
+    # Ephemeral pull consumer (no durable): messages are requested in batches
+    # of --batch. Fetching runs ahead of processing by up to --prefetch-depth
+    # batches so the next round-trip overlaps with handling the current batch.
+    # With --workers N, N subscriptions bind to the same consumer and the
+    # server load-balances deliveries between them.
+    #
+    # A single worker uses AckPolicy.ALL and acks only the last message of
+    # each batch, which acknowledges everything before it. That is unsafe
+    # once several workers share the consumer (one worker's ack would cover
+    # another's unprocessed messages), so --workers > 1 and --ack-each fall
+    # back to acking every message.
+    ack_each = args.ack_each or args.workers > 1
+    ack_policy = AckPolicy.EXPLICIT if ack_each else AckPolicy.ALL
+    subs = [await js.pull_subscribe(args.subject, config=ConsumerConfig(ack_policy=ack_policy))]
+    if args.workers > 1:
+        info = await subs[0].consumer_info()
+        for _ in range(args.workers - 1):
+            subs.append(await js.pull_subscribe_bind(info.name, stream=info.stream_name))
+
+    async def _fetch(sub, batches: asyncio.Queue):
+        while True:
+            try:
+                msgs = await sub.fetch(args.batch, timeout=5)
+            except asyncio.TimeoutError:
+                continue  # nothing published within the fetch window
+            try:
+                await batches.put(msgs)
+            except asyncio.CancelledError:
+                # Cancelled while waiting for queue space: this batch is in
+                # neither the queue nor a consumer, so nak it here.
+                await _nak(msgs)
+                raise
+
+    async def _consume(batches: asyncio.Queue):
+        while True:
+            msgs = await batches.get()
+            for msg in msgs:
+                handle(msg)
+            acks = msgs if ack_each else msgs[-1:]
+            results = await asyncio.gather(*(m.ack() for m in acks), return_exceptions=True)
+            for res in results:
+                if isinstance(res, Exception):
+                    print("ack error:", res)
+
+    queues: list[asyncio.Queue] = []
+    workers = []
+    for sub in subs:
+        batches: asyncio.Queue = asyncio.Queue(maxsize=args.prefetch_depth)
+        queues.append(batches)
+        workers.append(asyncio.create_task(_fetch(sub, batches)))
+        workers.append(asyncio.create_task(_consume(batches)))
+    return workers, queues
+
+
+async def run(args: argparse.Namespace):
+    """Main async entrypoint; configuration comes from CLI flags / env vars."""
 
     connect_opts: dict = {}
 
-    if creds_path:
-        connect_opts["user_credentials"] = creds_path
-    elif jwt_path and nkey_path:
-        jwt_cb, sig_cb = build_jwt_auth(jwt_path, nkey_path)
+    if args.creds:
+        connect_opts["user_credentials"] = args.creds
+    elif args.jwt and args.nkey:
+        jwt_cb, sig_cb = build_jwt_auth(args.jwt, args.nkey)
         connect_opts["user_jwt_cb"] = jwt_cb
         connect_opts["signature_cb"] = sig_cb
     else:
@@ -77,26 +341,47 @@ async def run():
             "Missing authentication details. Set NATS_CREDS or NATS_JWT & NATS_NKEY in your environment (see .env.example)."
         )
 
-    print(f"✈︎ Connecting to {server_url} …")
+    print(f"✈︎ Connecting to {args.server} …")
     try:
-        nc = await nats.connect(server_url, error_cb=lambda e: print("NATS error:", e), **connect_opts)
+        nc = await nats.connect(args.server, error_cb=lambda e: print("NATS error:", e), **connect_opts)
     except (ConnectionClosedError, TimeoutError, NoServersError) as e:
         raise SystemExit(f"Could not connect to NATS server: {e}") from e
 
-    print("✅ Connected – setting up JetStream push consumer on", subject)
-
-    js = nc.jetstream()
-
-    # Ephemeral push consumer (no durable). Auto-acks unless manual_ack=True.
-
-    async def _msg_cb(msg):  # type: ignore
-        print(f"[{msg.subject}] {msg.data.decode(errors='replace')}")
-        try:
-            await msg.ack()
-        except Exception as ack_err:  # noqa: BLE001
-            print("ack error:", ack_err)
-
-    await js.subscribe(subject, cb=_msg_cb)  # push, ephemeral
+    handle = make_handler(
+        text=args.text_stdout,
+        log_headers=args.log_headers,
+        subject_filter=compile_subject_filter(args.filters) if args.filters else None,
+    )
+    flusher = asyncio.create_task(_flusher())
+    workers: list[asyncio.Task] = []
+    queues: list[asyncio.Queue] = []
+
+    if args.mode == "pull":
+        print("✅ Connected – setting up JetStream pull consumer on", args.subject)
+        workers, queues = await _start_pull(nc.jetstream(), args, handle)
+    elif args.mode == "push":
+        print("✅ Connected – setting up JetStream push consumer on", args.subject)
+
+        # Ephemeral push consumer (no durable), acked per message.
+        async def _msg_cb(msg):  # type: ignore
+            handle(msg)
+            try:
+                await msg.ack()
+            except Exception as ack_err:  # noqa: BLE001
+                print("ack error:", ack_err)
+
+        await nc.jetstream().subscribe(args.subject, cb=_msg_cb)
+    elif args.mode == "core":
+        print("✅ Connected – subscribing (core NATS) to", args.subject)
+
+        # Plain core NATS: no acks or replay. Several workers join one queue
+        # group so the server spreads messages across their callbacks.
+        async def _core_cb(msg):  # type: ignore
+            handle(msg)
+
+        queue = args.queue or ("pump-workers" if args.workers > 1 else "")
+        for _ in range(args.workers):
+            await nc.subscribe(args.subject, queue=queue, cb=_core_cb)
 
     # Handle graceful shutdown
     stop_event = asyncio.Event()
@@ -109,19 +394,78 @@ async def run():
         loop.add_signal_handler(sig, _signal_handler)
 
     print("📡 Listening – press Ctrl+C to exit")
-    await stop_event.wait()
+    # Wake on a signal, when stdout fails, or as soon as any worker exits, so
+    # a failed fetch/ack loop shuts the consumer down instead of leaving it idle.
+    stopper = asyncio.create_task(stop_event.wait())
+    await asyncio.wait([stopper, flusher, *workers], return_when=asyncio.FIRST_COMPLETED)
+    stopper.cancel()
+
+    for task in workers:
+        task.cancel()
+    failed = False
+    for res in await asyncio.gather(*workers, return_exceptions=True):
+        if isinstance(res, Exception):
+            print("worker error:", res)
+            failed = True
+    for batches in queues:
+        await _nak_pending(batches)
 
-    print("Draining connection…")
-    await nc.drain()
+    try:
+        print("Draining connection…")
+        await nc.drain()
+    finally:
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+        _flush_out()
+
+    # A closed pipe means the reader is done, which is a normal way to stop.
+    if _out_error is not None and not isinstance(_out_error, BrokenPipeError):
+        print("stdout error:", _out_error, file=sys.stderr)
+        failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+def event_loop_policy(io_uring: bool = False) -> Optional[asyncio.AbstractEventLoopPolicy]:
+    """Return the policy of a faster event loop, or None for the default one.
+
+    Prefers uringcore's io_uring loop when requested on Linux, then uvloop.
+    """
+    if io_uring:
+        if platform.system() != "Linux":
+            print("--io-uring is only supported on Linux; falling back")
+        else:
+            try:
+                import uringcore
+            except ImportError:
+                print("--io-uring requested but 'uringcore' is not installed; falling back")
+            else:
+                return uringcore.EventLoopPolicy()
+
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.EventLoopPolicy()
 
 
 def main():
     "Entry point that loads .env and runs the async loop."  # noqa: D401
+    args = parse_args()
+    policy = event_loop_policy(args.io_uring)
     try:
-        asyncio.run(run())
+        if policy is not None and hasattr(asyncio, "Runner"):
+            # Python 3.11+: pass the loop in directly; loop policies are
+            # deprecated as of 3.14.
+            with asyncio.Runner(loop_factory=policy.new_event_loop) as runner:
+                runner.run(run(args))
+        else:
+            if policy is not None:
+                asyncio.set_event_loop_policy(policy)
+            asyncio.run(run(args))
     except KeyboardInterrupt:
         pass
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()